@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from functools import lru_cache
 
-from openai import OpenAI
+import httpx
+from openai import AsyncOpenAI, OpenAI
 from twilio.rest import Client
 
 from .settings import settings
@@ -13,10 +14,22 @@ def get_openai_client() -> OpenAI:
     return OpenAI(api_key=settings.openai_api_key)
 
 
+@lru_cache
+def get_async_openai_client() -> AsyncOpenAI:
+    return AsyncOpenAI(api_key=settings.openai_api_key)
+
+
 @lru_cache
 def get_twilio_client() -> Client:
     return Client(settings.twilio_account_sid, settings.twilio_auth_token)
 
 
+@lru_cache
+def get_http_client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(timeout=10)
+
+
 openai_client = get_openai_client()
+async_openai_client = get_async_openai_client()
 twilio_client = get_twilio_client()
+http_client = get_http_client()
@@ -1,8 +1,25 @@
 from __future__ import annotations
 
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List
 
-HTML_TEMPLATE = """<!doctype html>
+from jinja2 import DictLoader, Environment
+
+CARD_TEMPLATE = """<article class="card">
+  <h2>{{ place.get('name', 'Unknown') }}</h2>
+  <p class="address">{{ place.get('address', 'Address unavailable') }}</p>
+  <p class="meta">
+    <span>⭐ {{ place.get('rating', 'N/A') }}</span>
+    <span>Reviews: {{ place.get('user_rating_count', 0) }}</span>
+    <span>{{ place.get('price_level') or 'Price N/A' }}</span>
+  </p>
+  {%- set travel = place.get('travel') or {} %}
+  {%- if travel.get('duration_text') or travel.get('distance_text') %}
+  <p class="travel">{{ [travel.get('duration_text'), travel.get('distance_text')] | select | join(' · ') }}</p>
+  {%- endif %}
+</article>
+"""
+
+PAGE_TEMPLATE = """<!doctype html>
 <html lang="en">
 <head>
   <meta charset="utf-8" />
@@ -13,41 +30,35 @@ HTML_TEMPLATE = """<!doctype html>
   <main>
     <h1>Restaurant Recommendations</h1>
     <p class="subtitle">Here are the places we found for your last call.</p>
-    {content}
+    {%- if not results %}
+    <p>No restaurants were stored.</p>
+    {%- else %}
+    <section class="grid">
+    {%- for place in results %}
+    {% include 'card.html' %}
+    {%- endfor %}
+    </section>
+    {%- endif %}
   </main>
 </body>
 </html>
 """
 
+_ENV = Environment(
+    loader=DictLoader({"page.html": PAGE_TEMPLATE, "card.html": CARD_TEMPLATE}),
+    autoescape=True,
+    enable_async=True,
+)
+_PAGE_TMPL = _ENV.get_template("page.html")
+_CARD_TMPL = _ENV.get_template("card.html")
+
+
+async def render_card(place: Dict[str, str]) -> str:
+    """Render a single result card, used by the SSE dashboard stream."""
+    return await _CARD_TMPL.render_async(place=place)
+
 
-def render_results(results: List[Dict[str, str]]) -> str:
-    if not results:
-        return HTML_TEMPLATE.format(content="<p>No restaurants were stored.</p>")
-
-    cards: List[str] = []
-    for place in results:
-        travel_block = ""
-        travel = place.get("travel") or {}
-        if travel.get("duration_text") or travel.get("distance_text"):
-            travel_parts = [
-                travel.get("duration_text", ""),
-                travel.get("distance_text", ""),
-            ]
-            travel_block = f"<p class='travel'>{' · '.join(part for part in travel_parts if part)}</p>"
-
-        card = f"""
-        <article class="card">
-          <h2>{place.get('name', 'Unknown')}</h2>
-          <p class="address">{place.get('address', 'Address unavailable')}</p>
-          <p class="meta">
-            <span>⭐ {place.get('rating', 'N/A')}</span>
-            <span>Reviews: {place.get('user_rating_count', 0)}</span>
-            <span>{place.get('price_level') or 'Price N/A'}</span>
-          </p>
-          {travel_block}
-        </article>
-        """
-        cards.append(card)
-
-    section = "<section class='grid'>" + "\n".join(cards) + "</section>"
-    return HTML_TEMPLATE.format(content=section)
+async def iter_results(results: List[Dict[str, str]]) -> AsyncIterator[bytes]:
+    """Yield the dashboard page piece by piece instead of buffering it."""
+    async for chunk in _PAGE_TMPL.generate_async(results=results):
+        yield chunk.encode()
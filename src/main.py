@@ -1,18 +1,23 @@
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
 
+import orjson
+from cachetools import TTLCache
 from fastapi import FastAPI, Form, WebSocket, WebSocketDisconnect
+from markupsafe import escape
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from .clients import openai_client, twilio_client
-from .dashboard import render_results
+from sse_starlette.sse import EventSourceResponse
+
+from .clients import async_openai_client, http_client, twilio_client
+from .dashboard import iter_results, render_card
 from .place_search import search_restaurants
-from .session import ConversationSession, SessionStore
+from .session import ConversationSession, RedisSessionStore, SessionStore
 from .settings import settings
-from .slot_extractor import extract_slots, follow_up_for_missing
+from .slot_extractor import extract_slots_batched_async, follow_up_for_missing
 
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger("conversationrelay-minimal")
@@ -35,6 +40,7 @@ app = FastAPI(
     title="ConversationRelay Minimal",
     description="Twilio ConversationRelay starter with Google Places integration.",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
 app.add_middleware(
@@ -46,9 +52,41 @@ app.add_middleware(
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-session_store = SessionStore()
+# Sessions live in process memory by default; point REDIS_URL at a Redis
+# instance to share call state across multiple workers.
+session_store = (
+    RedisSessionStore(settings.redis_url) if settings.redis_url else SessionStore()
+)
+
+# Bounded with a TTL so a long-running worker doesn't accumulate every
+# search ever made; dashboard links go stale after an hour anyway.
+SEARCH_HISTORY: TTLCache = TTLCache(maxsize=10_000, ttl=3600)
+
+# ngrok_url and port are fixed for the process lifetime.
+_DASHBOARD_PREFIX = (
+    f"https://{settings.ngrok_url}/dashboard/"
+    if settings.ngrok_url
+    else f"http://localhost:{settings.port}/dashboard/"
+)
+
+
+# Only the token varies between frames, so splice it into precomputed
+# prefixes instead of rebuilding and serializing a dict per chunk.
+_TOKEN_FRAME_PREFIX = '{"type":"text","last":false,"token":'
+_TOKEN_FRAME_PREFIX_LAST = '{"type":"text","last":true,"token":'
+
 
-SEARCH_HISTORY: dict[str, dict[str, object]] = {}
+def encode_token_frame(token: str, last: bool) -> str:
+    """Build one text frame; orjson.dumps handles JSON string escaping."""
+    prefix = _TOKEN_FRAME_PREFIX_LAST if last else _TOKEN_FRAME_PREFIX
+    return prefix + orjson.dumps(token).decode() + "}"
+
+
+async def send_token(websocket: WebSocket, token: str, last: bool) -> None:
+    await websocket.send_text(encode_token_frame(token, last))
+
+
+SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
 
 
 def build_conversation(
@@ -57,10 +95,6 @@ def build_conversation(
     ready_for_search: bool,
     duplicate_request: bool,
 ) -> list[dict[str, str]]:
-    conversation: list[dict[str, str]] = [{"role": "system", "content": SYSTEM_PROMPT}]
-    for role, content in session.history:
-        conversation.append({"role": role, "content": content})
-
     status_payload = {
         "known_slots": session.slots,
         "missing_slots": missing_slots,
@@ -68,43 +102,45 @@ def build_conversation(
         "duplicate_request": duplicate_request,
     }
 
-    conversation.append(
-        {
-            "role": "system",
-            "content": (
-                "Conversation status: "
-                + json.dumps(status_payload)
-                + ". If missing_slots is not empty, ask for one of them naturally. "
-                "If ready_for_search is true and duplicate_request is false, acknowledge you'll search now. "
-                "If duplicate_request is true, remind the caller you've already shared results and offer to search again."
-            ),
-        }
-    )
+    status_message = {
+        "role": "system",
+        "content": (
+            "Conversation status: "
+            + orjson.dumps(status_payload).decode()
+            + ". If missing_slots is not empty, ask for one of them naturally. "
+            "If ready_for_search is true and duplicate_request is false, acknowledge you'll search now. "
+            "If duplicate_request is true, remind the caller you've already shared results and offer to search again."
+        ),
+    }
 
-    return conversation
+    messages = [SYSTEM_MESSAGE]
+    if session.summary:
+        messages.append(
+            {"role": "system", "content": f"Earlier in the call: {session.summary}"}
+        )
+    messages.extend(session.conversation_messages)
+    messages.append(status_message)
+    return messages
 
-# -- TODO 2: Streaming response handler -------------------------------
 async def ai_response_stream(
     conversation: list[dict[str, str]],
     websocket: WebSocket,
 ) -> str:
     full_response = ""
-    stream = openai_client.chat.completions.create(
+    stream = await async_openai_client.chat.completions.create(
         model="gpt-4o-mini",
         messages=conversation,
         stream=True,
         temperature=0.5,
     )
 
-    for chunk in stream:
+    async for chunk in stream:
         token = chunk.choices[0].delta.content or ""
         if token:
             full_response += token
-            await websocket.send_text(
-                json.dumps({"type": "text", "token": token, "last": False})
-            )
+            await send_token(websocket, token, last=False)
 
-    await websocket.send_text(json.dumps({"type": "text", "token": "", "last": True}))
+    await send_token(websocket, "", last=True)
     return full_response
 
 
@@ -120,64 +156,126 @@ async def health_check():
 
 @app.post("/twiml", tags=["twilio"])
 async def twiml_endpoint(From: str = Form(None), CallSid: str = Form(None)):
-    # -- TODO 1: TwiML handler and ws URL assembly -------------------------------
-
+    if CallSid and From:
+        session = session_store.get(CallSid)
+        session.caller_number = From
+        session_store.save(session)
+
+    ws_url = (
+        f"wss://{settings.ngrok_url}/ws"
+        if settings.ngrok_url
+        else f"ws://localhost:{settings.port}/ws"
+    )
+    twiml = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        "<Response>"
+        "<Connect>"
+        f'<ConversationRelay url="{escape(ws_url)}" />'
+        "</Connect>"
+        "</Response>"
+    )
+    return Response(content=twiml, media_type="text/xml")
 
 
 @app.post("/api/searches/{search_id}", tags=["dashboard"])
 async def get_search(search_id: str):
     data = SEARCH_HISTORY.get(search_id)
     if not data:
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=404, content={"error": "Search not found or expired."}
         )
     return data
 
 
-@app.get("/dashboard/{search_id}", response_class=HTMLResponse, tags=["dashboard"])
+@app.get("/dashboard/{search_id}", tags=["dashboard"])
 async def dashboard(search_id: str):
     data = SEARCH_HISTORY.get(search_id)
     if not data:
-        return HTMLResponse(
-            content=render_results([]),
-            status_code=404,
+        return StreamingResponse(
+            iter_results([]), media_type="text/html", status_code=404
+        )
+    return StreamingResponse(iter_results(data["results"]), media_type="text/html")
+
+
+@app.get("/dashboard/{search_id}/stream", tags=["dashboard"])
+async def dashboard_stream(search_id: str):
+    """Push result cards one by one so clients can render progressively."""
+    data = SEARCH_HISTORY.get(search_id)
+    if not data:
+        return ORJSONResponse(
+            status_code=404, content={"error": "Search not found or expired."}
         )
-    return HTMLResponse(content=render_results(data["results"]))
+
+    async def event_source():
+        for place in data["results"]:
+            yield {"event": "card", "data": await render_card(place)}
+        yield {"event": "done", "data": ""}
+
+    return EventSourceResponse(event_source())
+
+
+# Spoken only when slot extraction is slow enough for the caller to
+# notice dead air; cancelled before the sleep elapses otherwise.
+_FILLER_DELAY_SECONDS = 1.0
+_FILLER_TEXT = "One moment while I check that."
+
+
+async def _speak_filler(websocket: WebSocket, session: ConversationSession) -> None:
+    await asyncio.sleep(_FILLER_DELAY_SECONDS)
+    # The turn's reply already closed, so the filler is its own complete
+    # utterance; record it like any other assistant line.
+    await send_token(websocket, _FILLER_TEXT, last=True)
+    session.append("assistant", _FILLER_TEXT)
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     session: ConversationSession | None = None
+    pending_prompts: list[str] = []
 
     try:
         while True:
             raw_message = await websocket.receive_text()
-            event = json.loads(raw_message)
+            event = orjson.loads(raw_message)
             event_type = event.get("type")
 
-            if event_type == "setup":
+            if event_type == "interrupt":
+                # Nothing in the frame is used; the parse itself is cheap.
+                logger.info("⏸️ User interrupted")
+
+            elif event_type == "setup":
                 call_sid = event.get("callSid")
                 session = session_store.get(call_sid)
                 logger.info("📞 Call connected: %s", call_sid)
                 session.append("assistant", settings.welcome_greeting)
-                await websocket.send_text(
-                    json.dumps(
-                        {
-                            "type": "text",
-                            "token": settings.welcome_greeting,
-                            "last": False,
-                        }
-                    )
-                )
+                session_store.save(session)
+                await send_token(websocket, settings.welcome_greeting, last=False)
 
             elif event_type == "prompt" and session:
                 user_text = event.get("voicePrompt", "")
+                if event.get("last") is False:
+                    # Partial transcript; buffer it and extract once the
+                    # final piece arrives instead of once per fragment.
+                    pending_prompts.append(user_text)
+                    continue
+                utterances = [*pending_prompts, user_text]
+                pending_prompts.clear()
+                if len(utterances) > 1:
+                    user_text = " ".join(
+                        part.strip() for part in utterances if part.strip()
+                    )
                 normalized = user_text.strip().lower()
 
                 logger.info("🎤 User: %s", user_text)
                 session.append("user", user_text)
 
+                # Kick extraction off now so it overlaps the streamed
+                # reply; rule-only extractions finish almost immediately.
+                extraction = asyncio.create_task(
+                    extract_slots_batched_async(utterances, session.slots)
+                )
+
                 # Build conversation context using current slots
                 missing_before = session.missing_slots
                 ready_before = session.ready_for_search
@@ -197,30 +295,38 @@ async def websocket_endpoint(websocket: WebSocket):
                         if missing_before
                         else "Got it. Let me check the latest options for you."
                     )
-                    await websocket.send_text(
-                        json.dumps({"type": "text", "token": assistant_text, "last": True})
-                    )
+                    await send_token(websocket, assistant_text, last=True)
 
                 if assistant_text:
                     session.append("assistant", assistant_text)
 
-                # Update slots after the response has started streaming
-                session.update_slots(extract_slots(user_text, session.slots))
+                if session.has_pending_summary:
+                    asyncio.create_task(refresh_summary(session))
+
+                if extraction.done():
+                    session.update_slots(extraction.result())
+                else:
+                    # The LLM fallback is still running; cover the wait
+                    # with a short filler that is cancelled unspoken if
+                    # extraction lands before the delay elapses.
+                    filler = asyncio.create_task(_speak_filler(websocket, session))
+                    try:
+                        session.update_slots(await extraction)
+                    finally:
+                        filler.cancel()
                 missing_slots = session.missing_slots
                 ready_for_search = session.ready_for_search
                 duplicate_request = ready_for_search and session.should_skip_search(normalized)
 
                 if not ready_for_search or duplicate_request:
+                    session_store.save(session)
                     continue
 
-                result = search_restaurants(session.slots)
+                result = await search_restaurants(session.slots)
                 if not result["success"]:
                     session.append("assistant", result["message"])
-                    await websocket.send_text(
-                        json.dumps(
-                            {"type": "text", "token": result["message"], "last": True}
-                        )
-                    )
+                    session_store.save(session)
+                    await send_token(websocket, result["message"], last=True)
                     continue
 
                 session.mark_search(normalized)
@@ -231,23 +337,14 @@ async def websocket_endpoint(websocket: WebSocket):
                     "results": result["results"],
                 }
 
-                dashboard_url = (
-                    f"https://{settings.ngrok_url}/dashboard/{search_id}"
-                    if settings.ngrok_url
-                    else f"http://localhost:{settings.port}/dashboard/{search_id}"
-                )
+                dashboard_url = _DASHBOARD_PREFIX + search_id
 
                 voice_response = result["voice_response"]
                 session.append("assistant", voice_response)
-                await websocket.send_text(
-                    json.dumps({"type": "text", "token": voice_response, "last": True})
-                )
+                await send_token(websocket, voice_response, last=True)
 
                 await maybe_send_rcs(session, dashboard_url)
-
-            elif event_type == "interrupt":
-                logger.info("⏸️ User interrupted")
-                continue
+                session_store.save(session)
 
     except WebSocketDisconnect:
         if session:
@@ -258,6 +355,15 @@ async def websocket_endpoint(websocket: WebSocket):
         await websocket.close(code=1011)
 
 
+# A single form-encoded POST is all the Messages API needs; skipping the
+# SDK's resource-object machinery keeps the send off the voice path.
+_TWILIO_MESSAGES_URL = (
+    "https://api.twilio.com/2010-04-01/Accounts/"
+    f"{settings.twilio_account_sid}/Messages.json"
+)
+_TWILIO_AUTH = (settings.twilio_account_sid, settings.twilio_auth_token)
+
+
 async def maybe_send_rcs(session: ConversationSession, dashboard_url: str) -> None:
     if session.rcs_sent:
         return
@@ -265,18 +371,72 @@ async def maybe_send_rcs(session: ConversationSession, dashboard_url: str) -> No
         to_number = session.caller_number or fetch_caller_number(session.call_sid)
         if not to_number:
             return
-        # -- TODO 6: Sending RCS text -------------------------------
+        asyncio.create_task(send_rcs_message(to_number, dashboard_url))
         session.rcs_sent = True
     except Exception as exc:  # pragma: no cover
         logger.error("Failed to send RCS: %s", exc)
 
 
+async def refresh_summary(session: ConversationSession) -> None:
+    """Fold turns that dropped out of the history window into the summary."""
+    turns = session.take_pending_summary()
+    if not turns:
+        return
+    # If the call ends while the completion below is in flight, the session
+    # can be reset and pooled for a new caller; the generation check keeps
+    # this task from writing the old caller's summary into the new call.
+    generation = session.generation
+    transcript = "\n".join(f"{role}: {content}" for role, content in turns)
+    if session.summary:
+        transcript = f"Context so far: {session.summary}\n{transcript}"
+    try:
+        completion = await async_openai_client.chat.completions.create(
+            model="gpt-4o-mini",
+            temperature=0,
+            messages=[
+                {
+                    "role": "system",
+                    "content": (
+                        "Condense this phone-call excerpt into one short line of "
+                        "context, keeping any restaurant preferences the caller stated."
+                    ),
+                },
+                {"role": "user", "content": transcript},
+            ],
+        )
+        if session.generation != generation:
+            return
+        session.summary = (completion.choices[0].message.content or "").strip()
+        session_store.save(session)
+    except Exception as exc:  # pragma: no cover
+        logger.error("Could not refresh call summary: %s", exc)
+
+
+async def send_rcs_message(to_number: str, dashboard_url: str) -> None:
+    try:
+        response = await http_client.post(
+            _TWILIO_MESSAGES_URL,
+            data={
+                "To": to_number,
+                "MessagingServiceSid": settings.twilio_messaging_sid,
+                "Body": f"Here are your restaurant picks: {dashboard_url}",
+            },
+            auth=_TWILIO_AUTH,
+        )
+        response.raise_for_status()
+        logger.info("📲 Sent results link to %s", to_number)
+    except Exception as exc:  # pragma: no cover
+        logger.error("Failed to send RCS: %s", exc)
+
+
 def fetch_caller_number(call_sid: str) -> str | None:
     try:
         call = twilio_client.calls(call_sid).fetch()
         number = getattr(call, "from_", None)
         if number:
-            session_store.get(call_sid).caller_number = number
+            session = session_store.get(call_sid)
+            session.caller_number = number
+            session_store.save(session)
         return number
     except Exception as exc:  # pragma: no cover
         logger.error("Could not fetch caller number: %s", exc)
@@ -284,9 +444,20 @@ def fetch_caller_number(call_sid: str) -> str | None:
 
 
 def main():
+    import os
+
     import uvicorn
 
-    uvicorn.run("src.main:app", host="0.0.0.0", port=settings.port, reload=False)
+    uvicorn.run(
+        "src.main:app",
+        host="0.0.0.0",
+        port=settings.port,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        workers=int(os.environ.get("WEB_CONCURRENCY", 1)),
+        reload=False,
+    )
 
 
 if __name__ == "__main__":
@@ -1,17 +1,33 @@
 from __future__ import annotations
 
+import heapq
 import json
 import logging
 import time
 import uuid
+from operator import itemgetter
 from typing import Dict, List, Optional, Tuple
 
-import requests
+import httpx
+from cachetools import TTLCache
 
 from .settings import settings
 
 logger = logging.getLogger("conversationrelay-minimal")
 
+# Shared client so the Google calls reuse connections and never block
+# the event loop the websocket handler runs on. Generous keepalive keeps
+# warm TLS sessions to the Google endpoints between calls.
+_http = httpx.AsyncClient(
+    http2=True,
+    timeout=15,
+    limits=httpx.Limits(
+        max_connections=32,
+        max_keepalive_connections=20,
+        keepalive_expiry=60,
+    ),
+)
+
 GOOGLE_PLACES_BASE = "https://places.googleapis.com/v1"
 GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
 GOOGLE_DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
@@ -30,23 +46,59 @@ FIELD_MASK = ",".join(
 
 DEFAULT_TRAVEL_MINUTES = 15
 
-def geocode_location(location: str) -> Tuple[Optional[float], Optional[float]]:
+# Frozen once at import; search_restaurants copies the body template and
+# only fills in the volatile keys per request.
+_PLACES_URL = f"{GOOGLE_PLACES_BASE}/places:searchText"
+_BASE_HEADERS = {
+    "Content-Type": "application/json",
+    "X-Goog-Api-Key": settings.google_places_api_key,
+    "X-Goog-FieldMask": FIELD_MASK,
+}
+_BASE_BODY: Dict[str, object] = {
+    "includedType": "restaurant",
+    "maxResultCount": 15,
+    "strictTypeFiltering": True,
+    "rankPreference": "DISTANCE",
+}
+
+# Callers repeat the same location strings constantly ("downtown SF"),
+# so cache coordinates and skip the geocoding round-trip on repeats.
+_geocode_cache: TTLCache = TTLCache(maxsize=4096, ttl=24 * 3600)
+
+
+async def geocode_location(location: str) -> Tuple[Optional[float], Optional[float]]:
+    key = location.strip().casefold()
+    cached = _geocode_cache.get(key)
+    if cached is not None:
+        return cached
+
     params = {"address": location, "key": settings.google_places_api_key}
-    response = requests.get(GOOGLE_GEOCODE_URL, params=params, timeout=10)
+    response = await _http.get(GOOGLE_GEOCODE_URL, params=params)
     response.raise_for_status()
     results = response.json().get("results", [])
     if not results:
-        return None, None
-    geometry = results[0]["geometry"]["location"]
-    return geometry.get("lat"), geometry.get("lng")
+        coords: Tuple[Optional[float], Optional[float]] = (None, None)
+    else:
+        geometry = results[0]["geometry"]["location"]
+        coords = (geometry.get("lat"), geometry.get("lng"))
+    _geocode_cache[key] = coords
+    return coords
+
+
 
+# Rough meters-per-minute and radius cap per travel mode.
+_RADIUS_PARAMS = {
+    "walking": (80, 5000),
+    "transit": (400, 10000),
+    "driving": (500, 15000),
+}
 
 
 def build_location_bias(lat: float, lng: float, travel_mode: str, minutes: int) -> Dict:
-    if travel_mode == "walking":
-        radius = min(minutes * 80, 5000)  # approx 80 meters per minute
-    else:
-        radius = min(minutes * 400, 10000)  # transit covers more distance
+    per_minute, cap = _RADIUS_PARAMS.get(travel_mode, _RADIUS_PARAMS["walking"])
+    radius = per_minute * minutes
+    if radius > cap:
+        radius = cap
     return {
         "circle": {
             "center": {"latitude": lat, "longitude": lng},
@@ -67,7 +119,7 @@ def to_price_levels(budget: str | None) -> Optional[List[str]]:
     return mapping.get(budget)
 
 
-def search_restaurants(slots: Dict[str, Optional[str]]) -> Dict[str, object]:
+async def search_restaurants(slots: Dict[str, Optional[str]]) -> Dict[str, object]:
     cuisine = slots.get("cuisine") or "restaurant"
     location_text = slots.get("location") or ""
     budget = slots.get("budget")
@@ -77,18 +129,13 @@ def search_restaurants(slots: Dict[str, Optional[str]]) -> Dict[str, object]:
     except (TypeError, ValueError):
         travel_minutes = DEFAULT_TRAVEL_MINUTES
 
-    lat, lng = geocode_location(location_text)
+    lat, lng = await geocode_location(location_text)
     location_bias = None
     if lat and lng:
         location_bias = build_location_bias(lat, lng, travel_mode, travel_minutes)
 
-    body: Dict[str, object] = {
-        "textQuery": f"{cuisine} restaurants in {location_text}".strip(),
-        "includedType": "restaurant",
-        "maxResultCount": 15,
-        "strictTypeFiltering": True,
-        "rankPreference": "DISTANCE",
-    }
+    body = _BASE_BODY.copy()
+    body["textQuery"] = f"{cuisine} restaurants in {location_text}".strip()
 
     price_levels = to_price_levels(budget)
     if price_levels:
@@ -99,18 +146,10 @@ def search_restaurants(slots: Dict[str, Optional[str]]) -> Dict[str, object]:
         body["openNow"] = True
     logger.info("Google Places request body: %s", json.dumps(body, indent=2))
 
-    headers = {
-        "Content-Type": "application/json",
-        "X-Goog-Api-Key": settings.google_places_api_key,
-        "X-Goog-FieldMask": FIELD_MASK,
-    }
-
-    response = requests.post(
-        f"{GOOGLE_PLACES_BASE}/places:searchText", json=body, headers=headers, timeout=15
-    )
+    response = await _http.post(_PLACES_URL, json=body, headers=_BASE_HEADERS)
     try:
         response.raise_for_status()
-    except requests.HTTPError:
+    except httpx.HTTPStatusError:
         return {
             "success": False,
             "results": [],
@@ -125,8 +164,12 @@ def search_restaurants(slots: Dict[str, Optional[str]]) -> Dict[str, object]:
             "message": f"No {cuisine} spots found near {location_text}. Try adjusting your request.",
         }
 
-    scored = rank_places(places, travel_mode, travel_minutes, lat, lng)
-    recommendations = format_voice_summary(scored[:3], slots)
+    scored = await rank_places(places, travel_mode, travel_minutes, lat, lng)
+    # Pick the spoken top three in O(n) first so the voice reply isn't
+    # waiting on a full sort; the dashboard order is sorted once after.
+    top_places = heapq.nlargest(3, scored, key=_SCORE_KEY)
+    recommendations = format_voice_summary(top_places, slots)
+    scored.sort(key=_SCORE_KEY, reverse=True)
     search_id = str(uuid.uuid4())
 
     return {
@@ -137,46 +180,118 @@ def search_restaurants(slots: Dict[str, Optional[str]]) -> Dict[str, object]:
     }
 
 
-def rank_places(
+_SCORE_KEY = itemgetter("score")
+
+PRICE_LEVEL_LABELS = {
+    "PRICE_LEVEL_INEXPENSIVE": "$",
+    "PRICE_LEVEL_MODERATE": "$$",
+    "PRICE_LEVEL_EXPENSIVE": "$$$",
+    "PRICE_LEVEL_VERY_EXPENSIVE": "$$$$",
+}
+
+
+async def rank_places(
     places: List[Dict], travel_mode: str, travel_minutes: int, lat: Optional[float], lng: Optional[float]
 ) -> List[Dict]:
-    # -- TODO 4: Ranking algorithm -------------------------------
+    ranked: List[Dict] = []
+    for place in places:
+        ranked.append(
+            {
+                "name": (place.get("displayName") or {}).get("text", "Unknown"),
+                "address": place.get("formattedAddress", "Address unavailable"),
+                "rating": place.get("rating") or 0,
+                "user_rating_count": place.get("userRatingCount") or 0,
+                "price_level": PRICE_LEVEL_LABELS.get(place.get("priceLevel")),
+                "location": place.get("location") or {},
+                "travel": None,
+            }
+        )
 
+    if lat is not None and lng is not None:
+        await attach_travel_durations(ranked, lat, lng, travel_mode)
+
+    budget_seconds = travel_minutes * 60
+    for record in ranked:
+        # Rating weighted by how well-reviewed the place is, with a bonus
+        # for fitting inside the caller's travel budget.
+        confidence = min(record["user_rating_count"], 200) / 200
+        score = record["rating"] * confidence
+        travel = record["travel"]
+        if travel:
+            if travel["duration_seconds"] <= budget_seconds:
+                score += 1.0
+            else:
+                score -= (travel["duration_seconds"] - budget_seconds) / 600
+        record["score"] = round(score, 3)
+
+    return ranked
+
+
+async def attach_travel_durations(
+    records: List[Dict], user_lat: float, user_lng: float, mode: str
+) -> None:
+    """Fetch travel times for all places in one Distance Matrix request."""
+    targets = [
+        record
+        for record in records
+        if record["location"].get("latitude") is not None
+        and record["location"].get("longitude") is not None
+    ]
+    if not targets:
+        return
 
-def compute_travel_duration(
-    user_lat: float,
-    user_lng: float,
-    dest_lat: Optional[float],
-    dest_lng: Optional[float],
-    mode: str,
-) -> Optional[Dict[str, str]]:
-    if dest_lat is None or dest_lng is None:
-        return None
     params = {
         "origins": f"{user_lat},{user_lng}",
-        "destinations": f"{dest_lat},{dest_lng}",
+        "destinations": "|".join(
+            f"{record['location']['latitude']},{record['location']['longitude']}"
+            for record in targets
+        ),
         "mode": mode,
         "key": settings.google_places_api_key,
         "departure_time": str(int(time.time())),
     }
-    response = requests.get(GOOGLE_DISTANCE_MATRIX_URL, params=params, timeout=10)
+    response = await _http.get(GOOGLE_DISTANCE_MATRIX_URL, params=params)
     try:
         response.raise_for_status()
-    except requests.HTTPError:
-        return None
+    except httpx.HTTPStatusError:
+        return
     data = response.json()
     try:
-        element = data["rows"][0]["elements"][0]
-        if element["status"] != "OK":
-            return None
-        return {
+        elements = data["rows"][0]["elements"]
+    except (KeyError, IndexError):
+        return
+
+    for record, element in zip(targets, elements):
+        if element.get("status") != "OK":
+            continue
+        record["travel"] = {
             "distance_text": element["distance"]["text"],
             "duration_text": element["duration"]["text"],
             "duration_seconds": element["duration"]["value"],
         }
-    except (KeyError, IndexError):
-        return None
 
 
 def format_voice_summary(top_places: List[Dict], slots: Dict[str, Optional[str]]) -> str:
-    # -- TODO 5: Voice summary -------------------------------
+    if not top_places:
+        return "I couldn't find any matches for that. Want to adjust your search?"
+
+    cuisine = slots.get("cuisine") or "restaurant"
+    fragments: List[str] = []
+    for place in top_places:
+        fragment = place["name"]
+        travel = place.get("travel")
+        if travel:
+            fragment += f", about {travel['duration_text']} away"
+        elif place.get("rating"):
+            fragment += f", rated {place['rating']}"
+        fragments.append(fragment)
+
+    if len(fragments) == 1:
+        spoken = fragments[0]
+    else:
+        spoken = ", ".join(fragments[:-1]) + f", and {fragments[-1]}"
+
+    return (
+        f"Here's what I found for {cuisine}: {spoken}. "
+        "I'll text you a link with the full list."
+    )
@@ -1,7 +1,16 @@
 from __future__ import annotations
 
+import re
+import threading
+from collections import deque
 from dataclasses import dataclass, field
-from typing import Dict, Iterable, List, Optional, Tuple
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+
+# Turns kept verbatim in the LLM context; older turns are folded into a
+# one-line summary so prompt size (and prefill latency) stays bounded.
+HISTORY_WINDOW = 20
 
 FORCE_NEW_SEARCH_PHRASES = {
     "search again",
@@ -14,63 +23,136 @@ FORCE_NEW_SEARCH_PHRASES = {
     "find more",
 }
 
+_FORCE_NEW_RE = re.compile("|".join(re.escape(p) for p in FORCE_NEW_SEARCH_PHRASES))
+
 REQUIRED_FIELDS = ("cuisine", "location", "budget", "travel_mode", "travel_minutes")
 
+_SIGNATURE_FIELDS = REQUIRED_FIELDS + ("open_now", "open_until")
+
+_EMPTY_SLOTS: Dict[str, Optional[str]] = {
+    "cuisine": None,
+    "location": None,
+    "budget": None,
+    "travel_mode": None,
+    "travel_minutes": None,
+    "open_now": None,
+    "open_until": None,
+}
+
 
-@dataclass
+@dataclass(slots=True)
 class ConversationSession:
-    """Stores per-call state including slots and prior searches."""
+    """Stores per-call state including slots and prior searches.
+
+    slots=True keeps instances lean: with many concurrent calls the
+    per-instance __dict__ is pure overhead, and attribute reads on the
+    per-turn hot path go through slot descriptors instead of dict lookups.
+    The slot-value mapping itself stays a dict because the Places and
+    extractor APIs consume it as a payload.
+    """
 
     call_sid: str
     caller_number: Optional[str] = None
-    slots: Dict[str, Optional[str]] = field(
-        default_factory=lambda: {
-            "cuisine": None,
-            "location": None,
-            "budget": None,
-            "travel_mode": None,
-            "travel_minutes": None,
-            "open_now": None,
-            "open_until": None,
-        }
-    )
-    history: List[Tuple[str, str]] = field(default_factory=list)
+    slots: Dict[str, Optional[str]] = field(default_factory=lambda: dict(_EMPTY_SLOTS))
+    history: Deque[Tuple[str, str]] = field(default_factory=list)
     last_search_signature: Tuple[Tuple[str, str], ...] | None = None
     last_prompt_text: Optional[str] = None
     rcs_sent: bool = False
+    summary: Optional[str] = None
+    _conversation: Deque[Dict[str, str]] = field(
+        default_factory=list, init=False, repr=False
+    )
+    _missing_cache: Optional[List[str]] = field(default=None, init=False, repr=False)
+    _signature_cache: Tuple[Tuple[str, str], ...] | None = field(
+        default=None, init=False, repr=False
+    )
+    _pending_summary: List[Tuple[str, str]] = field(
+        default_factory=list, init=False, repr=False
+    )
+    _generation: int = field(default=0, init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.history = deque(self.history, maxlen=HISTORY_WINDOW)
+        self._conversation = deque(
+            ({"role": role, "content": content} for role, content in self.history),
+            maxlen=HISTORY_WINDOW,
+        )
+
+    @property
+    def conversation_messages(self) -> Deque[Dict[str, str]]:
+        """History pre-shaped as chat messages, appended to turn by turn."""
+        return self._conversation
 
     def append(self, role: str, content: str) -> None:
+        if len(self.history) == HISTORY_WINDOW:
+            # The oldest turn is about to fall out of the window; queue it
+            # for summarization instead of losing it outright.
+            self._pending_summary.append(self.history[0])
         self.history.append((role, content))
+        self._conversation.append({"role": role, "content": content})
+
+    @property
+    def generation(self) -> int:
+        """Bumped by reset(); lets background tasks detect a recycled session.
+
+        A fire-and-forget task (e.g. the summary refresh) may still be
+        awaiting I/O when the call ends and the session is pooled for a new
+        caller. The task captures this value before awaiting and must drop
+        its result if it no longer matches afterwards, so one caller's data
+        never lands in another caller's session.
+        """
+        return self._generation
+
+    @property
+    def has_pending_summary(self) -> bool:
+        return bool(self._pending_summary)
+
+    def take_pending_summary(self) -> List[Tuple[str, str]]:
+        turns = self._pending_summary
+        self._pending_summary = []
+        return turns
 
     def update_slots(self, updates: Dict[str, Optional[str]]) -> None:
+        # Normalize once at write time so signature() and comparisons
+        # never re-run strip/lower on read.
         for key, value in updates.items():
-            if value is not None and value != "":
-                self.slots[key] = value
+            if value is None or value == "":
+                continue
+            normalized = str(value).strip().lower()
+            if normalized and self.slots.get(key) != normalized:
+                self.slots[key] = normalized
+                self._missing_cache = None
+                self._signature_cache = None
 
     @property
     def missing_slots(self) -> List[str]:
-        missing = [key for key in REQUIRED_FIELDS if not self.slots.get(key)]
-        return missing
+        # Read several times per turn; recomputed only after a slot changes.
+        if self._missing_cache is None:
+            self._missing_cache = [
+                key for key in REQUIRED_FIELDS if not self.slots.get(key)
+            ]
+        return self._missing_cache
 
     @property
     def ready_for_search(self) -> bool:
         return not self.missing_slots
 
     def signature(self) -> Tuple[Tuple[str, str], ...]:
-        sig: List[Tuple[str, str]] = []
-        for key in REQUIRED_FIELDS + ("open_now", "open_until"):
-            value = self.slots.get(key)
-            if value:
-                sig.append((key, str(value).strip().lower()))
-        return tuple(sig)
+        # Recomputed only after update_slots changes a value; every turn
+        # reads this via should_skip_search.
+        if self._signature_cache is None:
+            self._signature_cache = tuple(
+                (key, value)
+                for key in _SIGNATURE_FIELDS
+                if (value := self.slots.get(key))
+            )
+        return self._signature_cache
 
     def should_skip_search(self, normalized_prompt: str) -> bool:
         signature = self.signature()
         if not signature:
             return False
-        if normalized_prompt and any(
-            phrase in normalized_prompt for phrase in FORCE_NEW_SEARCH_PHRASES
-        ):
+        if normalized_prompt and _FORCE_NEW_RE.search(normalized_prompt):
             return False
         return signature == (self.last_search_signature or ())
 
@@ -78,23 +160,134 @@ class ConversationSession:
         self.last_search_signature = self.signature()
         self.last_prompt_text = normalized_prompt
 
+    def reset(self, call_sid: str) -> None:
+        """Return the session to its initial state, reusing its containers."""
+        self.call_sid = call_sid
+        self.caller_number = None
+        self.slots.update(_EMPTY_SLOTS)
+        self.history.clear()
+        self._conversation.clear()
+        self.last_search_signature = None
+        self.last_prompt_text = None
+        self.rcs_sent = False
+        self.summary = None
+        self._missing_cache = None
+        self._signature_cache = None
+        self._pending_summary.clear()
+        self._generation += 1
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "call_sid": self.call_sid,
+            "caller_number": self.caller_number,
+            "slots": self.slots,
+            "history": [list(turn) for turn in self.history],
+            "last_search_signature": (
+                [list(pair) for pair in self.last_search_signature]
+                if self.last_search_signature is not None
+                else None
+            ),
+            "last_prompt_text": self.last_prompt_text,
+            "rcs_sent": self.rcs_sent,
+            "summary": self.summary,
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Dict[str, object]) -> "ConversationSession":
+        signature = payload.get("last_search_signature")
+        return cls(
+            call_sid=payload["call_sid"],
+            caller_number=payload.get("caller_number"),
+            slots=payload.get("slots") or {},
+            history=[tuple(turn) for turn in payload.get("history") or []],
+            last_search_signature=(
+                tuple(tuple(pair) for pair in signature)
+                if signature is not None
+                else None
+            ),
+            last_prompt_text=payload.get("last_prompt_text"),
+            rcs_sent=bool(payload.get("rcs_sent")),
+            summary=payload.get("summary"),
+        )
+
 
 class SessionStore:
-    """Simple in-memory session tracker."""
+    """Simple in-memory session tracker.
+
+    Individual dict operations are GIL-atomic, so plain reads need no
+    locking under asyncio; the lock only guards the check-then-insert in
+    get() so two racing callers can't both create a session for the same
+    call_sid.
+    """
+
+    _POOL_CAP = 64
 
     def __init__(self):
         self._sessions: Dict[str, ConversationSession] = {}
+        self._lock = threading.Lock()
+        self._pool: List[ConversationSession] = []
 
     def get(self, call_sid: str) -> ConversationSession:
-        if call_sid not in self._sessions:
-            self._sessions[call_sid] = ConversationSession(call_sid=call_sid)
-        return self._sessions[call_sid]
+        session = self._sessions.get(call_sid)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(call_sid)
+                if session is None:
+                    if self._pool:
+                        session = self._pool.pop()
+                        session.reset(call_sid)
+                    else:
+                        session = ConversationSession(call_sid=call_sid)
+                    self._sessions[call_sid] = session
+        return session
+
+    def save(self, session: ConversationSession) -> None:
+        # Sessions are mutated in place, so there is nothing to write back.
+        pass
 
     def clear(self, call_sid: str) -> None:
-        self._sessions.pop(call_sid, None)
+        session = self._sessions.pop(call_sid, None)
+        if session is not None and len(self._pool) < self._POOL_CAP:
+            # Reset before pooling so transcripts aren't retained between
+            # calls; steady-state call churn then allocates nothing.
+            session.reset("")
+            self._pool.append(session)
 
     def clear_all(self) -> None:
         self._sessions.clear()
+        self._pool.clear()
 
     def with_callers(self) -> Iterable[ConversationSession]:
         return self._sessions.values()
+
+
+class RedisSessionStore:
+    """Session tracker backed by Redis so workers can share call state."""
+
+    _KEY_PREFIX = "session:"
+
+    def __init__(self, url: str, ttl: int = 3600):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._ttl = ttl
+
+    def get(self, call_sid: str) -> ConversationSession:
+        raw = self._redis.get(self._KEY_PREFIX + call_sid)
+        if raw:
+            return ConversationSession.from_dict(orjson.loads(raw))
+        return ConversationSession(call_sid=call_sid)
+
+    def save(self, session: ConversationSession) -> None:
+        self._redis.set(
+            self._KEY_PREFIX + session.call_sid,
+            orjson.dumps(session.to_dict()),
+            ex=self._ttl,
+        )
+
+    def clear(self, call_sid: str) -> None:
+        self._redis.delete(self._KEY_PREFIX + call_sid)
+
+    def clear_all(self) -> None:
+        for key in self._redis.scan_iter(self._KEY_PREFIX + "*"):
+            self._redis.delete(key)
@@ -10,6 +10,7 @@ class Settings(BaseSettings):
 
     port: int = Field(default=8080, env="PORT")
     ngrok_url: Optional[str] = Field(default=None, env="NGROK_URL")
+    redis_url: Optional[str] = Field(default=None, env="REDIS_URL")
 
     openai_api_key: str = Field(env="OPENAI_API_KEY")
     google_places_api_key: str = Field(env="GOOGLE_PLACES_API_KEY")
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
-import json
-from typing import Dict, Optional
+import re
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
 
-from .clients import openai_client
+import orjson
+
+try:  # optional accelerator; the token-set path covers its absence
+    import ahocorasick
+except ImportError:  # pragma: no cover
+    ahocorasick = None
+
+from .clients import async_openai_client, openai_client
+from .session import REQUIRED_FIELDS
 
 FOLLOW_UP_PROMPTS = {
     "cuisine": "What kind of food are you craving?",
@@ -13,71 +22,421 @@ FOLLOW_UP_PROMPTS = {
     "travel_minutes": "How many minutes are you comfortable traveling?",
 }
 
+# Frozen index over the required fields; missing_slots only ever contains
+# these, so the per-turn lookup is an index into a tuple.
+_PROMPT_INDEX = {field: i for i, field in enumerate(REQUIRED_FIELDS)}
+_PROMPTS = tuple(FOLLOW_UP_PROMPTS[field] for field in REQUIRED_FIELDS)
+
 
-# -- TODO 3: Extracting Slots using LLM -------------------------------
 FIELD_SPECS = [
+    ("cuisine", "the type of food the caller wants, e.g. 'thai' or 'pizza'"),
+    ("location", "the neighborhood, cross streets, or area to search"),
+    ("budget", "the price level as '$', '$$', '$$$', or '$$$$'"),
+    ("travel_mode", "'walking' or 'transit'"),
+    ("travel_minutes", "the maximum travel time in minutes, as an integer"),
+    ("open_now", "true if the caller wants somewhere open right now"),
+    ("open_until", "a time the place should stay open until, e.g. '10 pm'"),
 ]
 
-SYSTEM_INSTRUCTION = """
-"""
+FIELD_NAMES = tuple(name for name, _ in FIELD_SPECS)
+
+# Kept terse on purpose: the prompt is re-sent on every extraction call,
+# so every token here is paid for per turn. gpt-4o-mini follows the
+# compact form as reliably as the long-form field descriptions did.
+SYSTEM_INSTRUCTION = (
+    "Extract restaurant-search slots from the caller's utterance as JSON with "
+    "keys: " + ", ".join(FIELD_NAMES) + ".\n"
+    "null for anything not said. Short lowercase strings.\n"
+    "travel_mode: walking|transit. budget: $|$$|$$$|$$$$. "
+    "travel_minutes: integer."
+)
+
+
+class _BraceScanner:
+    """Tracks JSON brace depth across streamed tokens, string-aware.
+
+    feed() returns True once the top-level object closes, so callers can
+    stop consuming the stream and skip the generation tail.
+    """
+
+    __slots__ = ("depth", "started", "in_string", "escaped")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.started = False
+        self.in_string = False
+        self.escaped = False
+
+    def feed(self, token: str) -> bool:
+        for char in token:
+            if self.escaped:
+                self.escaped = False
+            elif self.in_string:
+                if char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+                self.started = True
+            elif char == "}":
+                self.depth -= 1
+        return self.started and self.depth == 0
+
+
+def _extraction_messages(utterance_key: str, prior_key: str) -> List[Dict[str, str]]:
+    return [
+        {"role": "system", "content": SYSTEM_INSTRUCTION},
+        {
+            "role": "user",
+            "content": (
+                f"Caller said: {utterance_key}\n"
+                f"Previous slot values (for reference only):\n{prior_key}\n"
+                "Return the updated JSON now."
+            ),
+        },
+    ]
+
+
+@lru_cache(maxsize=2048)
+def _cached_extract(utterance_key: str, prior_key: str) -> str:
+    """Run the extraction completion; memoized on the normalized inputs."""
+    stream = openai_client.chat.completions.create(
+        model="gpt-4o-mini",
+        temperature=0,
+        response_format={"type": "json_object"},
+        stream=True,
+        messages=_extraction_messages(utterance_key, prior_key),
+    )
+
+    parts: List[str] = []
+    scanner = _BraceScanner()
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        token = chunk.choices[0].delta.content or ""
+        if not token:
+            continue
+        parts.append(token)
+        if scanner.feed(token):
+            break
+    return "".join(parts)
+
+
+# lru_cache does not compose with coroutines, so the async path memoizes
+# into a plain dict with the same capacity, evicting oldest-inserted.
+_ASYNC_CACHE: Dict[Tuple[str, str], str] = {}
+_ASYNC_CACHE_MAX = 2048
+
+
+async def _cached_extract_async(utterance_key: str, prior_key: str) -> str:
+    """Async twin of _cached_extract; runs on the event loop, not a thread."""
+    key = (utterance_key, prior_key)
+    cached = _ASYNC_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    stream = await async_openai_client.chat.completions.create(
+        model="gpt-4o-mini",
+        temperature=0,
+        response_format={"type": "json_object"},
+        stream=True,
+        messages=_extraction_messages(utterance_key, prior_key),
+    )
+
+    parts: List[str] = []
+    scanner = _BraceScanner()
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        token = chunk.choices[0].delta.content or ""
+        if not token:
+            continue
+        parts.append(token)
+        if scanner.feed(token):
+            break
+
+    payload = "".join(parts)
+    if len(_ASYNC_CACHE) >= _ASYNC_CACHE_MAX:
+        _ASYNC_CACHE.pop(next(iter(_ASYNC_CACHE)))
+    _ASYNC_CACHE[key] = payload
+    return payload
+
 
 def extract_slots(
     utterance: str, previous: Dict[str, Optional[str]] | None = None
 ) -> Dict[str, Optional[str]]:
     """
-    Use OpenAI to extract slot values from the latest utterance, taking prior
-    slot values into account.
+    Extract slot values from the latest utterance, taking prior slot values
+    into account. The deterministic rules run first; the LLM is only asked
+    when the rules plus prior slots still leave a required field open.
     """
 
-    prior_context = json.dumps(previous or {}, indent=2)
+    deterministic = extract_slots_rules(utterance)
+    known = previous or {}
+    if all(deterministic.get(f) or known.get(f) for f in REQUIRED_FIELDS):
+        return deterministic
 
-    completion = openai_client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0,
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": SYSTEM_INSTRUCTION},
-            {
-                "role": "user",
-                "content": (
-                    f"Caller said: {utterance}\n"
-                    f"Previous slot values (for reference only):\n{prior_context}\n"
-                    "Return the updated JSON now."
-                ),
-            },
-        ],
+    llm = _extract_slots_llm(
+        utterance,
+        {**known, **{k: v for k, v in deterministic.items() if v}},
     )
+    return {f: llm.get(f) or deterministic.get(f) for f in FIELD_NAMES}
+
+
+def _extract_slots_llm(
+    utterance: str, previous: Dict[str, Optional[str]]
+) -> Dict[str, Optional[str]]:
+    """
+    Use OpenAI to extract slot values. Repeated short utterances ("yes",
+    "walking") against the same prior slots hit the in-process cache
+    instead of the API.
+    """
 
-    raw_payload = completion.choices[0].message.content
-    parsed = json.loads(raw_payload)
+    utterance_key = utterance.strip().lower()
+    prior_key = orjson.dumps(previous, option=orjson.OPT_SORT_KEYS).decode()
+
+    raw_payload = _cached_extract(utterance_key, prior_key)
+    parsed = orjson.loads(raw_payload)
     return _normalise_slots(parsed)
 
 
+async def extract_slots_async(
+    utterance: str, previous: Dict[str, Optional[str]] | None = None
+) -> Dict[str, Optional[str]]:
+    """
+    Async variant of extract_slots for use inside the websocket handler,
+    where a blocking completion call would stall every other connection.
+    Same rules-first short circuit; only the LLM fallback awaits.
+    """
+
+    deterministic = extract_slots_rules(utterance)
+    known = previous or {}
+    if all(deterministic.get(f) or known.get(f) for f in REQUIRED_FIELDS):
+        return deterministic
+
+    utterance_key = utterance.strip().lower()
+    prior = {**known, **{k: v for k, v in deterministic.items() if v}}
+    prior_key = orjson.dumps(prior, option=orjson.OPT_SORT_KEYS).decode()
+
+    raw_payload = await _cached_extract_async(utterance_key, prior_key)
+    llm = _normalise_slots(orjson.loads(raw_payload))
+    return {f: llm.get(f) or deterministic.get(f) for f in FIELD_NAMES}
+
+
+def extract_slots_batched(
+    utterances: List[str], previous: Dict[str, Optional[str]] | None = None
+) -> Dict[str, Optional[str]]:
+    """
+    Extract once for a burst of quick utterances (e.g. buffered partial
+    transcripts) instead of paying one completion per fragment.
+    """
+
+    joined = "\n".join(u.strip() for u in utterances if u and u.strip())
+    return extract_slots(joined, previous)
+
+
+async def extract_slots_batched_async(
+    utterances: List[str], previous: Dict[str, Optional[str]] | None = None
+) -> Dict[str, Optional[str]]:
+    joined = "\n".join(u.strip() for u in utterances if u and u.strip())
+    return await extract_slots_async(joined, previous)
+
+
+extract_slots.cache_clear = _cached_extract.cache_clear
+
+
+# --- Deterministic extraction ------------------------------------------------
+# Keyword and pattern matching only, no network. All patterns are compiled
+# once at import so the per-utterance cost is pure Pattern.search calls.
+
+CUISINE_KEYWORDS = (
+    "thai",
+    "italian",
+    "mexican",
+    "chinese",
+    "japanese",
+    "sushi",
+    "ramen",
+    "pho",
+    "vietnamese",
+    "korean",
+    "indian",
+    "mediterranean",
+    "greek",
+    "french",
+    "spanish",
+    "tapas",
+    "ethiopian",
+    "seafood",
+    "pizza",
+    "burgers",
+    "barbecue",
+    "vegan",
+    "vegetarian",
+)
+
+TRAVEL_MODE_KEYWORDS = {
+    "walking": "walking",
+    "walk": "walking",
+    "on foot": "walking",
+    "transit": "transit",
+    "train": "transit",
+    "bus": "transit",
+    "subway": "transit",
+    "metro": "transit",
+    "public transport": "transit",
+    "public transit": "transit",
+}
+
+BUDGET_KEYWORDS = {
+    "cheap": "$",
+    "inexpensive": "$",
+    "affordable": "$",
+    "mid-range": "$$",
+    "midrange": "$$",
+    "moderate": "$$",
+    "upscale": "$$$",
+    "expensive": "$$$",
+    "fine dining": "$$$$",
+    "splurge": "$$$$",
+}
+
+_FOOD_FALLBACK_RE = re.compile(r"\b([a-z]+)\s+food\b")
+
+# Tokenization only needs punctuation stripped; translate + split runs in
+# C without the regex engine, and the table is built once at import.
+_PUNCT_TABLE = str.maketrans({char: " " for char in ",.!?;:"})
+
+# With pyahocorasick installed, cuisine matching is a single automaton
+# pass whose cost stays flat no matter how large the keyword list grows.
+if ahocorasick is not None:
+    _CUISINE_AUTOMATON = ahocorasick.Automaton()
+    for _keyword in CUISINE_KEYWORDS:
+        _CUISINE_AUTOMATON.add_word(_keyword, _keyword)
+    _CUISINE_AUTOMATON.make_automaton()
+else:  # pragma: no cover
+    _CUISINE_AUTOMATON = None
+_LOCATION_RE = re.compile(r"\b(?:near|around|in|close to)\s+(.+?)(?:[,.]|$)")
+_BUDGET_SYMBOL_RE = re.compile(r"\$+")
+_BUDGET_AMOUNT_RE = re.compile(r"(?:under|below|around|about)\s+\$?(\d{2,3})\b")
+_MINUTES_RE = re.compile(r"(\d{1,2})\s*(?:minutes?|mins?)\b")
+_OPEN_UNTIL_RE = re.compile(r"(?:open\s+)?until\s+(\d{1,2}(?::\d{2})?\s*(?:am|pm)?)")
+
+
+def _extract_cuisine(text: str, token_set: set[str]) -> Optional[str]:
+    if _CUISINE_AUTOMATON is not None:
+        best = None
+        last = len(text) - 1
+        for end, keyword in _CUISINE_AUTOMATON.iter(text):
+            start = end - len(keyword) + 1
+            # Post-check word boundaries to keep the \b semantics.
+            if start and text[start - 1].isalnum():
+                continue
+            if end < last and text[end + 1].isalnum():
+                continue
+            if best is None or len(keyword) > len(best):
+                best = keyword
+        if best:
+            return best
+    else:
+        cuisine = next((k for k in CUISINE_KEYWORDS if k in token_set), None)
+        if cuisine:
+            return cuisine
+    match = _FOOD_FALLBACK_RE.search(text)
+    return match.group(1) if match else None
+
+
+def _extract_location(text: str) -> Optional[str]:
+    match = _LOCATION_RE.search(text)
+    return match.group(1).strip() if match else None
+
+
+def _budget_from_dollars(dollars: int) -> str:
+    """Map a spoken dollar amount onto the price-level ladder."""
+    if dollars < 20:
+        return "$"
+    if dollars < 40:
+        return "$$"
+    if dollars < 70:
+        return "$$$"
+    return "$$$$"
+
+
+def _extract_budget(text: str, token_set: set[str]) -> Optional[str]:
+    match = _BUDGET_AMOUNT_RE.search(text)
+    if match:
+        return _budget_from_dollars(int(match.group(1)))
+    match = _BUDGET_SYMBOL_RE.search(text)
+    if match:
+        return "$" * min(len(match.group(0)), 4)
+    return next((v for k, v in BUDGET_KEYWORDS.items() if k in token_set), None)
+
+
+def _extract_travel(text: str, token_set: set[str]) -> Tuple[Optional[str], Optional[str]]:
+    mode = next((v for k, v in TRAVEL_MODE_KEYWORDS.items() if k in token_set), None)
+    match = _MINUTES_RE.search(text)
+    return mode, match.group(1) if match else None
+
+
+def _extract_open(text: str) -> Tuple[Optional[str], Optional[str]]:
+    open_now = "true" if "open now" in text else None
+    match = _OPEN_UNTIL_RE.search(text)
+    return open_now, match.group(1).strip() if match else None
+
+
+def extract_slots_rules(utterance: str) -> Dict[str, Optional[str]]:
+    """Extract whatever slots simple rules can find, without any network."""
+    text = utterance.lower()
+    # Scan once: unigrams plus bigrams cover every keyword table, so the
+    # keyword extractors become set lookups instead of repeated scans.
+    tokens = text.translate(_PUNCT_TABLE).split()
+    token_set = set(tokens)
+    token_set.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    travel_mode, travel_minutes = _extract_travel(text, token_set)
+    open_now, open_until = _extract_open(text)
+    return {
+        "cuisine": _extract_cuisine(text, token_set),
+        "location": _extract_location(text),
+        "budget": _extract_budget(text, token_set),
+        "travel_mode": travel_mode,
+        "travel_minutes": travel_minutes,
+        "open_now": open_now,
+        "open_until": open_until,
+    }
+
+
 def _normalise_slots(payload: Dict[str, object]) -> Dict[str, Optional[str]]:
-    normalised: Dict[str, Optional[str]] = {}
-    for field in FIELD_NAMES:
-        value = payload.get(field)
-        normalised[field] = _normalise_value(value)
-    return normalised
+    get = payload.get
+    return {field: _normalise_value(get(field)) for field in FIELD_NAMES}
+
+
+# One dict lookup on the concrete type replaces the isinstance chain.
+# Keying on type() rather than isinstance also sidesteps the
+# bool-is-a-subclass-of-int ordering trap for free.
+_VALUE_HANDLERS = {
+    bool: lambda value: "true" if value else "false",
+    int: str,
+    float: lambda value: str(int(value)),
+    str: lambda value: value.strip() or None,
+}
 
 
 def _normalise_value(value: object) -> Optional[str]:
     if value in (None, "", "null"):
         return None
-    if isinstance(value, bool):
-        return "true" if value else "false"
-    if isinstance(value, (int, float)):
-        return str(int(value)) if isinstance(value, float) else str(value)
-    if isinstance(value, str):
-        stripped = value.strip()
-        return stripped or None
-    return json.dumps(value)
+    handler = _VALUE_HANDLERS.get(type(value))
+    if handler is not None:
+        return handler(value)
+    return orjson.dumps(value).decode()
 
 
 def follow_up_for_missing(missing: list[str]) -> str:
     if not missing:
         return "Thanks! I have everything I need. Let me find a few options for you now."
-    next_slot = missing[0]
-    return FOLLOW_UP_PROMPTS.get(
-        next_slot, "Could you tell me a bit more so I can narrow it down?"
-    )
+    index = _PROMPT_INDEX.get(missing[0])
+    if index is None:
+        return "Could you tell me a bit more so I can narrow it down?"
+    return _PROMPTS[index]